@@ -36,7 +36,7 @@ class ERA5Manager(object):
 
     """
     def __init__(self, CONFIG, period, region, passwd, work,
-                 save_disk, work_mode, vars_mode):
+                 save_disk, work_mode, vars_mode, connect_db=True):
         self.CONFIG = CONFIG
         self.period = period
         self.region = region
@@ -90,7 +90,10 @@ class ERA5Manager(object):
 
         self.zorders = self.CONFIG['plot']['zorders']['compare']
 
-        utils.setup_database(self, Base)
+        # Managers which only download ERA5 data, e.g. in subprocesses,
+        # do not need database connection
+        if connect_db:
+            utils.setup_database(self, Base)
 
         self.grid_lons = None
         self.grid_lats = None
@@ -301,13 +304,21 @@ class ERA5Manager(object):
             'time':hour_times
         }
 
+        # Download to temporary file then rename it, so that other
+        # processes never see a partially written file at `file_path`
+        tmp_file_path = f'{file_path}.{os.getpid()}.tmp'
         try:
             self.cdsapi_client.retrieve(
                 'reanalysis-era5-single-levels',
                 request,
-                file_path)
-        except Exception as msg:
-            breakpoint()
+                tmp_file_path)
+            os.replace(tmp_file_path, file_path)
+        except Exception:
+            # Do not leave partially downloaded file behind, and let
+            # caller handle the failure
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            raise
 
         return file_path
 
@@ -367,13 +378,21 @@ class ERA5Manager(object):
             'time':hour_times
         }
 
+        # Download to temporary file then rename it, so that other
+        # processes never see a partially written file at `file_path`
+        tmp_file_path = f'{file_path}.{os.getpid()}.tmp'
         try:
             self.cdsapi_client.retrieve(
                 'reanalysis-era5-pressure-levels',
                 request,
-                file_path)
-        except Exception as msg:
-            breakpoint()
+                tmp_file_path)
+            os.replace(tmp_file_path, file_path)
+        except Exception:
+            # Do not leave partially downloaded file behind, and let
+            # caller handle the failure
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            raise
 
         return file_path
 
@@ -1,6 +1,9 @@
 import datetime
 import logging
+import math
+import sys
 import time
+from collections import namedtuple
 
 from global_land_mask import globe
 from sqlalchemy.ext.declarative import declarative_base
@@ -11,17 +14,83 @@ from netCDF4 import Dataset
 import numpy as np
 import pygrib
 from scipy import interpolate
+from joblib import Parallel, delayed, effective_n_jobs
 
 import utils
 import satel_scs
 import era5
 
 Base = declarative_base()
+# Picklable copy of TC record, which can be sent to subprocesses
+TCRecord = namedtuple('TCRecord', ['sid', 'name', 'date_time', 'lon',
+                                   'lat'])
+# matchManager of current subprocess and arguments constructing it
+subprocess_manager = None
+subprocess_manager_args = None
+
+
+class SMAPERA5Row(object):
+    """Plain container of SMAP data and matching ERA5 data, which is
+    used in subprocesses instead of SMAPERA5 table class, so that
+    subprocesses do not need database to build rows.
+
+    """
+    pass
+
+
+def extract_rows_in_subprocess(CONFIG, period, region, basin, passwd,
+                               save_disk, tcs, smap_file_path):
+    """Extract SMAP data and matching ERA5 data around TC records which
+    share one SMAP file in subprocess.
+
+    matchManager cannot be pickled, so every subprocess constructs its
+    own one and reuses it for following TC records.  joblib reuses
+    subprocesses across runs, so it is constructed again when arguments
+    differ from those of the previous call.
+
+    Return
+    ------
+    tcs_rows: list
+        Rows returned by `extract_rows` for each TC record.  Empty for
+        TC record whose extracting fails, so that main process records
+        it as not matched.
+
+    """
+    global subprocess_manager, subprocess_manager_args
+    manager_args = (CONFIG, period, region, basin, passwd, save_disk)
+    if subprocess_manager is None or subprocess_manager_args != manager_args:
+        # Subprocesses share terminal with main process, so error
+        # handlers must not open pdb with `breakpoint()` in them
+        sys.breakpointhook = lambda *args, **kws: None
+        subprocess_manager = matchManager(CONFIG, period, region, basin,
+                                          passwd, save_disk, work=False,
+                                          in_subprocess=True)
+        subprocess_manager_args = manager_args
+
+    tcs_rows = []
+    try:
+        for tc in tcs:
+            try:
+                rows = subprocess_manager.extract_rows(tc, smap_file_path)
+            # Error handlers of ERA5 part call `exit()` after logging
+            except (Exception, SystemExit) as msg:
+                subprocess_manager.logger.error((
+                    f"""Fail extracting SMAP and ERA5 around TC """
+                    f"""{tc.name} on {tc.date_time}: {msg}"""))
+                rows = []
+            tcs_rows.append(rows)
+    finally:
+        # Subprocesses are kept alive and reused by joblib, so close
+        # SMAP file here instead of leaving it open in idle subprocess
+        subprocess_manager.close_smap_datasets()
+
+    return tcs_rows
+
 
 class matchManager(object):
 
     def __init__(self, CONFIG, period, region, basin, passwd, save_disk,
-                 work):
+                 work, in_subprocess=False):
         self.CONFIG = CONFIG
         self.period = period
         self.region = region
@@ -32,7 +101,9 @@ class matchManager(object):
         self.basin = basin
 
         self.logger = logging.getLogger(__name__)
-        utils.setup_database(self, Base)
+        # Subprocesses only extract rows, which needs no database
+        if not in_subprocess:
+            utils.setup_database(self, Base)
 
         self.years = [x for x in range(self.period[0].year,
                                        self.period[1].year+1)]
@@ -45,10 +116,10 @@ class matchManager(object):
 
         self.spa_resolu['smap'] = self.CONFIG['rss'][
             'spatial_resolution']
-        self.lats['smap'] = [
-            y * self.spa_resolu['smap'] - 89.875 for y in range(720)]
-        self.lons['smap'] = [
-            x * self.spa_resolu['smap'] + 0.125 for x in range(1440)]
+        self.lats['smap'] = np.array([
+            y * self.spa_resolu['smap'] - 89.875 for y in range(720)])
+        self.lons['smap'] = np.array([
+            x * self.spa_resolu['smap'] + 0.125 for x in range(1440)])
 
         self.spa_resolu['era5'] = self.CONFIG['era5'][
             'spatial_resolution']
@@ -64,17 +135,39 @@ class matchManager(object):
 
         self.pres_lvls = self.CONFIG['era5']['pres_lvls']
 
-        utils.setup_database(self, Base)
-
         self.grid_lons = None
         self.grid_lats = None
         self.grid_x = None
         self.grid_y = None
-        # Load 4 variables above
-        utils.load_grid_lonlat_xy(self)
+        if not in_subprocess:
+            # Load 4 variables above
+            utils.load_grid_lonlat_xy(self)
 
         self.sources = ['era5', 'smap']
 
+        # Managers keep no state between downloads, so construct them
+        # once instead of for every TC record
+        if in_subprocess:
+            # SMAP files are downloaded by main process, so only ERA5
+            # manager is needed
+            self.satel_manager = None
+            self.era5_manager = era5.ERA5Manager(
+                self.CONFIG, self.period, self.region,
+                self.db_root_passwd, work=False,
+                save_disk=self.save_disk, work_mode='', vars_mode='',
+                connect_db=False)
+        else:
+            self.satel_manager = satel_scs.SCSSatelManager(
+                self.CONFIG, self.period, self.region,
+                self.db_root_passwd, save_disk=self.save_disk,
+                work=False)
+            self.era5_manager = era5.ERA5Manager(
+                self.CONFIG, self.period, self.region,
+                self.db_root_passwd, work=False,
+                save_disk=self.save_disk, work_mode='', vars_mode='')
+        # Opened SMAP files keyed by path
+        self.smap_datasets = dict()
+
         if work:
             self.extract()
 
@@ -88,34 +181,111 @@ class matchManager(object):
             IBTrACS.date_time >= self.period[0],
             IBTrACS.date_time <= self.period[1]
         )
-        total = tc_query.count()
+        # Fetch all records at once with only needed columns, so that
+        # peeking next record does not query database again.  Records
+        # are read-only here, so rows are enough instead of ORM objects
+        tcs = tc_query.with_entities(
+            IBTrACS.sid, IBTrACS.name, IBTrACS.date_time, IBTrACS.lon,
+            IBTrACS.lat).order_by(IBTrACS.key).all()
+        # Check whether all TC records are on land at once
+        tcs_lat = np.array([tc.lat for tc in tcs])
+        tcs_lon = np.array([tc.lon for tc in tcs])
+        converted_lons = np.where(tcs_lon > 180, tcs_lon - 360, tcs_lon)
+        on_land = globe.is_land(tcs_lat, converted_lons)
+        # TC records to be extracted by `run_jobs`
+        self.jobs = []
         # Traverse WP TCs
-        for idx, tc in enumerate(tc_query):
+        for idx, (tc, next_tc) in enumerate(zip(tcs, tcs[1:] + [None])):
             try:
-                converted_lon = utils.longitude_converter(
-                    tc.lon, '360', '-180')
-                if bool(globe.is_land(tc.lat, converted_lon)):
+                if on_land[idx]:
                     continue
                 if tc.date_time.minute or tc.date_time.second:
                     continue
-                if idx < total - 1:
-                    next_tc = tc_query[idx + 1]
+                if next_tc is not None:
                     # This TC and next TC is same TC
                     if tc.sid == next_tc.sid:
                         self.extract_between_two_tc_records(tc, next_tc)
                     # This TC differents next TC
                     else:
-                        success = self.extract_detail(tc)
-                        self.info_after_extracting_detail(tc, success,
-                                                          True)
+                        self.add_job(tc, True)
                 else:
-                    success = self.extract_detail(tc)
-                    self.info_after_extracting_detail(tc, success,
-                                                      True)
+                    self.add_job(tc, True)
             except Exception as msg:
                 breakpoint()
                 exit(msg)
 
+        self.run_jobs()
+
+    def add_job(self, tc, update_match):
+        """Add TC record to be extracted by `run_jobs`.
+
+        parameters
+        ----------
+        tc: IBTrACS table row
+            May be interpolated, not originally from IBTrACS.
+        update_match: bool or None
+            Passed to `info_after_extracting_detail` after extracting.
+            None means not to call it.
+
+        """
+        self.jobs.append((
+            TCRecord(tc.sid, tc.name, tc.date_time, tc.lon, tc.lat),
+            update_match))
+
+    def run_jobs(self):
+        """Extract around TC records of jobs in subprocesses, then
+        insert extracted data and update match table in this process.
+
+        """
+        n_jobs = self.CONFIG['match']['n_jobs']
+        chunk_size = self.CONFIG['match']['jobs_chunk_size']
+        # Create table in advance, so that subprocesses do not race to
+        # create it
+        SMAPERA5 = utils.create_smap_era5_table(self, None)
+
+        with Parallel(n_jobs=n_jobs, backend='loky',
+                      batch_size='auto') as parallel:
+            for start in range(0, len(self.jobs), chunk_size):
+                chunk = self.jobs[start:start + chunk_size]
+                # Downloading is not safe across processes, e.g. TC
+                # records on same date share one SMAP file, so download
+                # in this process at first
+                smap_file_paths = [
+                    self.satel_manager.download('smap', tc.date_time)
+                    for tc, _ in chunk
+                ]
+                # Group consecutive TC records which share one SMAP
+                # file, so that subprocess opens that file once for
+                # whole group.  Limit size of group to keep all
+                # subprocesses busy.
+                group_size = math.ceil(len(chunk)
+                                       / effective_n_jobs(n_jobs))
+                groups = []
+                for (tc, _), smap_file_path in zip(chunk,
+                                                   smap_file_paths):
+                    if (groups and groups[-1][1] == smap_file_path
+                            and len(groups[-1][0]) < group_size):
+                        groups[-1][0].append(tc)
+                    else:
+                        groups.append(([tc], smap_file_path))
+                groups_rows = parallel(
+                    delayed(extract_rows_in_subprocess)(
+                        self.CONFIG, self.period, self.region,
+                        self.basin, self.db_root_passwd,
+                        self.save_disk, tcs, smap_file_path)
+                    for tcs, smap_file_path in groups
+                )
+                chunk_rows = [rows for tcs_rows in groups_rows
+                              for rows in tcs_rows]
+
+                for (tc, update_match), rows in zip(chunk, chunk_rows):
+                    success = self.insert_rows(SMAPERA5, rows)
+                    if update_match is not None:
+                        self.info_after_extracting_detail(
+                            tc, success, update_match)
+
+        self.jobs = []
+
     def info_after_extracting_detail(self, tc, success, update_match):
         Match = utils.create_match_table(self, ['smap', 'era5'])
 
@@ -155,13 +325,13 @@ class matchManager(object):
         # Skip interpolating between two TC recors if two neighbouring
         # records of TC are far away in time
         if delta.days:
-            self.extract_detail(tc)
+            self.add_job(tc, None)
             return
         hours = int(delta.seconds / 3600)
         # Skip interpolating between two TC recors if two neighbouring
         # records of TC are too close in time
         if not hours:
-            self.extract_detail(tc)
+            self.add_job(tc, None)
             return
 
         Match = utils.create_match_table(self, ['smap', 'era5'])
@@ -211,45 +381,89 @@ class matchManager(object):
                        f"""on {interped_tc.date_time}"""))
                 continue
 
-            success = self.extract_detail(interped_tc)
-            self.info_after_extracting_detail(interped_tc, success,
-                                              False)
+            self.add_job(interped_tc, False)
 
     def extract_with_not_all_hours_hit(self, tc, next_tc, hours):
         for h in range(hours):
             interped_tc = utils.interp_tc(self, h, tc, next_tc)
 
-            success = self.extract_detail(interped_tc)
-            self.info_after_extracting_detail(interped_tc, success,
-                                              True)
+            self.add_job(interped_tc, True)
+
+    def extract_rows(self, tc, smap_file_path):
+        """Extract SMAP data and matching ERA5 data around TC record.
+
+        Return
+        ------
+        rows: list
+            Extracted rows represented as dict, so that they can be sent
+            back from subprocess.  Empty if there is no SMAP data around
+            TC.  Exceptions are raised when extracting fails.
 
-    def extract_detail(self, tc):
-        SMAPERA5 = utils.create_smap_era5_table(self, tc.date_time)
+        """
+        # Exceptions are handled per TC record by
+        # `extract_rows_in_subprocess`, so do not catch them here
+        data, hourtimes, area = self.extract_smap(tc, SMAPERA5Row,
+                                                  smap_file_path)
         # Skip this turn if there is no SMAP data around TC
-        try:
-            data, hourtimes, area = self.extract_smap(tc, SMAPERA5)
-            if not len(data) or not len(hourtimes) or not len(area):
-                return False
-        except Exception as msg:
-            breakpoint()
-            exit(msg)
+        if not len(data) or not len(hourtimes) or not len(area):
+            return []
 
-        try:
-            data = utils.add_era5(self, 'smap', tc, data,
-                                  hourtimes, area)
-            if not len(data):
-                return False
-        except Exception as msg:
-            breakpoint()
-            exit(msg)
+        data = utils.add_era5(self, 'smap', tc, data, hourtimes, area)
+
+        return [utils.row2dict(row) for row in data]
 
-        utils.bulk_insert_avoid_duplicate_unique(
-            data, self.CONFIG['database']['batch_size']['insert'],
-            SMAPERA5, ['satel_datetime_lon_lat'], self.session,
-            check_self=True)
+    def insert_rows(self, SMAPERA5, rows):
+        """Insert rows returned by `extract_rows`.
+
+        Return
+        ------
+        success: bool
+            Whether there is any row.
+
+        """
+        if not len(rows):
+            return False
+
+        utils.bulk_insert_mappings_avoid_duplicate_unique(
+            rows, self.CONFIG['database']['batch_size']['insert'],
+            SMAPERA5, ['satel_datetime_lon_lat'], self.session)
 
         return True
 
+    def nearest_idx(self, arr_lat, arr_lon):
+        """Get indices of the nearest points in SMAP grid.
+
+        parameters
+        ----------
+        arr_lat: float or array_like
+        arr_lon: float or array_like
+            Range is from 0 to 360.
+
+        Return
+        ------
+        lat_idx: int or ndarray
+        lon_idx: int or ndarray
+
+        Notes
+        -----
+        SMAP grid is regular, so the nearest index can be calculated
+        directly rather than searching the whole grid.  Like
+        `utils.get_nearest_element_and_index`, the smaller index wins
+        when a point is exactly between two grid points.
+
+        """
+        res = self.spa_resolu['smap']
+        lat_idx = np.ceil((np.asarray(arr_lat) - self.lats['smap'][0])
+                          / res - 0.5)
+        lon_idx = np.ceil((np.asarray(arr_lon) - self.lons['smap'][0])
+                          / res - 0.5)
+        lat_idx = np.clip(lat_idx, 0,
+                          len(self.lats['smap']) - 1).astype(int)
+        lon_idx = np.clip(lon_idx, 0,
+                          len(self.lons['smap']) - 1).astype(int)
+
+        return lat_idx, lon_idx
+
     def get_square_around_tc(self, tc_lon, tc_lat):
         """Get indices of square corners around tropical cyclone center
         in grid.
@@ -271,12 +485,10 @@ class matchManager(object):
 
         """
         try:
-            tc_lon_in_grid, tc_lon_in_grid_idx = \
-                utils.get_nearest_element_and_index(
-                    self.lons['smap'], tc_lon)
-            tc_lat_in_grid, tc_lat_in_grid_idx = \
-                utils.get_nearest_element_and_index(
-                    self.lats['smap'], tc_lat)
+            tc_lat_in_grid_idx, tc_lon_in_grid_idx = self.nearest_idx(
+                tc_lat, tc_lon)
+            tc_lat_in_grid_idx = int(tc_lat_in_grid_idx)
+            tc_lon_in_grid_idx = int(tc_lon_in_grid_idx)
             lat1_idx = (tc_lat_in_grid_idx
                         - self.half_edge_grid_intervals)
             lat1 = self.lats['smap'][lat1_idx]
@@ -312,7 +524,7 @@ class matchManager(object):
         return success, lat1_idx, lat2_idx, lon1_idx, lon2_idx,\
             lat1, lon1
 
-    def extract_smap(self, tc, SMAPERA5):
+    def extract_smap(self, tc, SMAPERA5, smap_file_path):
         """Extract SMAP data according to tropical cyclone data
         from IBTrACS.
 
@@ -329,7 +541,10 @@ class matchManager(object):
             not originally from IBTrACS.
         SMAPERA5: table class
             Repersentation of SMAP data and matching ERA5 data around
-            tropical cyclone.
+            tropical cyclone.  `SMAPERA5Row` in subprocesses.
+        smap_file_path: str
+            Path of SMAP file on date of tropical cyclone.  None if
+            downloading fails.
 
         Return
         ------
@@ -340,36 +555,44 @@ class matchManager(object):
             o'clock and 5 o'clock.
 
         """
-        try:
-            satel_manager = satel_scs.SCSSatelManager(
-                self.CONFIG, self.period, self.region,
-                self.db_root_passwd,
-                save_disk=self.save_disk, work=False)
-            smap_file_path = satel_manager.download('smap',
-                                                    tc.date_time)
-            if smap_file_path is None:
-                return [], None, None
-            data, hourtimes, area = self.get_smap_part(
-                SMAPERA5, tc, smap_file_path)
-        except Exception as msg:
-            breakpoint()
-            exit(msg)
+        if smap_file_path is None:
+            return [], None, None
+        data, hourtimes, area = self.get_smap_part(
+            SMAPERA5, tc, smap_file_path)
 
         # if tc.date_time == datetime.datetime(2015, 5, 7, 23, 0, 0):
         #     breakpoint()
 
         return data, hourtimes, area
 
+    def open_smap_dataset(self, smap_file_path):
+        """Open SMAP file.  Consecutive TC records on the same date share
+        one SMAP file, so the opened file is reused until another file
+        is requested.
+
+        """
+        if smap_file_path not in self.smap_datasets:
+            self.close_smap_datasets()
+            dataset = Dataset(smap_file_path)
+            # VERY VERY IMPORTANT: netCDF4 auto mask all windspd which
+            # faster than 1 m/s, so must disable auto mask
+            dataset.set_auto_mask(False)
+            self.smap_datasets[smap_file_path] = dataset
+
+        return self.smap_datasets[smap_file_path]
+
+    def close_smap_datasets(self):
+        for dataset in self.smap_datasets.values():
+            dataset.close()
+        self.smap_datasets = dict()
+
     def get_smap_part(self, SMAPERA5, tc, smap_file_path):
-        success, lat1_idx, lat2_idx, lon1_idx, lon2_idx, lat1, lon1 = \
+        success, lat1_idx, lat2_idx, lon1_idx, lon2_idx, _, _ = \
                 self.get_square_around_tc(tc.lon, tc.lat)
         if not success:
             return [], None, None
 
-        dataset = Dataset(smap_file_path)
-        # VERY VERY IMPORTANT: netCDF4 auto mask all windspd which
-        # faster than 1 m/s, so must disable auto mask
-        dataset.set_auto_mask(False)
+        dataset = self.open_smap_dataset(smap_file_path)
         vars = dataset.variables
         # Square around TC does not cross the prime meridian
         minute = vars['minute'][lat1_idx:lat2_idx+1,
@@ -377,118 +600,95 @@ class matchManager(object):
         wind = vars['wind'][lat1_idx:lat2_idx+1,
                             lon1_idx:lon2_idx+1, :]
 
-        lats_num, lons_num, passes_num = minute.shape
         minute_missing = self.CONFIG['smap']['missing_value']['minute']
         wind_missing = self.CONFIG['smap']['missing_value']['wind']
 
+        # Filter pixels with whole arrays instead of traversing every
+        # pixel of every pass in Python
+        valid = ((minute != minute_missing)
+                 & (wind != wind_missing)
+                 & (minute != 1440)
+                 & (minute[:, :, 0:1] != minute[:, :, 1:2]))
+        ys, xs, passes = np.nonzero(valid)
+        satel_minutes = minute[ys, xs, passes].astype(np.int32)
+
+        # Temporal window is one hour
+        tc_seconds = (tc.date_time.hour * 3600 + tc.date_time.minute * 60
+                      + tc.date_time.second)
+        # MUST use abs() method
+        delta_seconds = np.abs(satel_minutes * 60 - tc_seconds)
+        # XXX: if write as `delta.seconds > 1800`,
+        # datetime.datetime(year, month, day, hour, 30)
+        # will be rounded into next hour, making a little
+        # repetition because that datetime will be used
+        # when iterate next hour too.
+        # FIXME: But if change following line to
+        # `delta.seconds > 1800`, something wrong will
+        # happen, e.g. SFMR, SMAP and SMAP prediction do
+        # not match any more even they do match
+        in_window = delta_seconds <= 1800
+
+        # Same as `utils.hour_rounder`
+        hourtimes_of_pixels = satel_minutes // 60 + (
+            satel_minutes % 60) // 30
+        # Skip situation that hour is rounded to next day
+        in_window &= hourtimes_of_pixels < 24
+
+        # Keep pixels as parallel arrays, SMAPERA5 rows are only
+        # generated for pixels that survive filtering
+        y_arr = ys[in_window]
+        x_arr = xs[in_window]
+        satel_minutes = satel_minutes[in_window]
+        hourtimes_of_pixels = hourtimes_of_pixels[in_window]
+        # Grid axes of square are sliced from SMAP grid built once in
+        # `__init__`, then indexed by pixels
+        lat_axis = self.lats['smap'][lat1_idx:lat2_idx+1]
+        lon_axis = self.lons['smap'][lon1_idx:lon2_idx+1]
+        lat_arr = lat_axis[y_arr]
+        lon_arr = lon_axis[x_arr]
+        smap_windspd_arr = wind[y_arr, x_arr, passes[in_window]]
+
+        if not len(y_arr):
+            return [], None, None
+
+        # SMAP originally has land mask, so it's not
+        # necessary to check whether each pixel is land
+        # or ocean
+        tc_date = datetime.datetime.combine(tc.date_time.date(),
+                                            datetime.time(0, 0, 0))
+        lats_list = lat_arr.tolist()
+        lons_list = lon_arr.tolist()
+        satel_datetimes = [
+            tc_date + datetime.timedelta(minutes=satel_minute)
+            for satel_minute in satel_minutes.tolist()
+        ]
+        # Build unique keys from columns in bulk rather than reading
+        # attributes back from every row
+        keys = [
+            f'{satel_datetime}_{lon}_{lat}' for satel_datetime, lon, lat
+            in zip(satel_datetimes, lons_list, lats_list)
+        ]
+
         data = []
-        lats = []
-        lons = []
-        north = -90
-        west = 360
-        south = 90
-        east = 0
-        hourtimes = set()
-
-        for y in range(lats_num):
-            lat_of_row = y * self.spa_resolu['smap'] + lat1
-
-            for x in range(lons_num):
-                lon_of_col = x * self.spa_resolu['smap'] + lon1
-                lon_of_col = (lon_of_col + 360) % 360
-
-                for i in range(passes_num):
-                    try:
-                        if (tc.date_time == datetime.datetime(
-                            2017, 6, 21, 12, 0, 0)
-                            and x - self.half_edge_grid_intervals == 2
-                            and y - self.half_edge_grid_intervals == 8):
-                            breakpoint()
-                        if (minute[y][x][i] == minute_missing
-                            or wind[y][x][i] == wind_missing):
-                            continue
-                        if minute[y][x][0] == minute[y][x][1]:
-                            continue
-                        if minute[y][x][i] == 1440:
-                            continue
-                        time_ = datetime.time(
-                            *divmod(int(minute[y][x][i]), 60), 0)
-                        # Temporal window is one hour
-                        pixel_dt = datetime.datetime.combine(
-                            tc.date_time.date(), time_)
-                        # MUST use abs() method
-                        delta = abs(pixel_dt - tc.date_time)
-                        # XXX: if write as `delta.seconds > 1800`,
-                        # datetime.datetime(year, month, day, hour, 30)
-                        # will be rounded into next hour, making a little
-                        # repetition because that datetime will be used
-                        # when iterate next hour too.
-                        # FIXME: But if change following line to
-                        # `delta.seconds > 1800`, something wrong will
-                        # happen, e.g. SFMR, SMAP and SMAP prediction do
-                        # not match any more even they do match
-                        if delta.days or delta.seconds > 1800:
-                            continue
-
-                        # SMAP originally has land mask, so it's not
-                        # necessary to check whether each pixel is land
-                        # or ocean
-                        row = SMAPERA5()
-                        row.sid = tc.sid
-                        row.satel_datetime = pixel_dt
-                        row.x = x - self.half_edge_grid_intervals
-                        row.y = y - self.half_edge_grid_intervals
-
-                        row.lon = lon_of_col
-                        # if row.lon < west:
-                        #     west = row.lon
-                        # if row.lon > east:
-                        #     east = row.lon
-                        lons.append(row.lon)
-
-                        row.lat = lat_of_row
-                        # if row.lat < south:
-                        #     south = row.lat
-                        # if row.lat > north:
-                        #     north = row.lat
-                        lats.append(row.lat)
-
-                        row.satel_datetime_lon_lat = (
-                            f"""{row.satel_datetime}"""
-                            f"""_{row.lon}_{row.lat}""")
-                        row.smap_windspd = float(wind[y][x][i])
-
-
-                        this_hourtime = utils.hour_rounder(
-                            row.satel_datetime).hour
-                        # Skip situation that hour is rounded to next
-                        # day
-                        if (row.satel_datetime.hour == 23
-                                and this_hourtime == 0):
-                            continue
-
-                        # Strictest reading rule: None of columns is none
-                        skip = False
-                        for key in row.__dict__.keys():
-                            if getattr(row, key) is None:
-                                skip = True
-                                break
-                        if skip:
-                            continue
-                        else:
-                            data.append(row)
-                            hourtimes.add(this_hourtime)
-                    except Exception as msg:
-                        breakpoint()
-                        exit(msg)
-
-        if not len(data):
-            return data, None, None
-
-        north = max(lats)
-        south = min(lats)
-        east = max(lons)
-        west = min(lons)
+        for y, x, lat, lon, windspd, satel_datetime, key in zip(
+                y_arr.tolist(), x_arr.tolist(), lats_list, lons_list,
+                smap_windspd_arr.tolist(), satel_datetimes, keys):
+            row = SMAPERA5()
+            row.sid = tc.sid
+            row.satel_datetime = satel_datetime
+            row.x = x - self.half_edge_grid_intervals
+            row.y = y - self.half_edge_grid_intervals
+            row.lon = lon
+            row.lat = lat
+            row.satel_datetime_lon_lat = key
+            row.smap_windspd = windspd
+            data.append(row)
+
+        hourtimes = set(hourtimes_of_pixels.tolist())
+        north = float(lat_arr.max())
+        south = float(lat_arr.min())
+        east = float(lon_arr.max())
+        west = float(lon_arr.min())
         # 'area' parameter to request ERA5 data via API:
         # North, West, South, East
         # e.g. [12.125, 188.875, 3.125, 197.875]
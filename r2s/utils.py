@@ -1,12 +1,14 @@
+import contextlib
 import copy
 import datetime
+import functools
 import logging
 import math
 import os
 import signal
 import sys
 import pickle
-from collections import Counter
+from collections import Counter, defaultdict
 
 import numpy as np
 from urllib import request
@@ -871,6 +873,50 @@ def bulk_insert_avoid_duplicate_unique(total_sample, batch_size,
     session.commit()
 
 
+def bulk_insert_mappings_avoid_duplicate_unique(total_mappings,
+                                                batch_size, table_class,
+                                                unique_cols, session):
+    """
+    Bulkly insert dicts into a table which has unique columns.  Same as
+    `bulk_insert_avoid_duplicate_unique` with `check_self=True`, but
+    dicts are inserted without constructing table class objects.
+
+    """
+    # Remove duplicate dicts, keep the first one
+    unique_mappings = dict()
+    for mapping in total_mappings:
+        unique_mappings.setdefault(
+            tuple([mapping[name] for name in unique_cols]), mapping)
+    total_keys = list(unique_mappings.keys())
+
+    for start in range(0, len(total_keys), batch_size):
+        batch_keys = total_keys[start:start + batch_size]
+
+        existing_keys = set(
+            tuple(data)
+            for data in session.query(
+                *[getattr(table_class, name) for name in unique_cols]
+            ).filter(
+                tuple_(*[getattr(table_class, name)
+                         for name in unique_cols]).in_(
+                             [tuple_(*key) for key in batch_keys]
+                         )
+            )
+        )
+
+        inserts = [unique_mappings[key] for key in batch_keys
+                   if key not in existing_keys]
+
+        try:
+            if inserts:
+                session.bulk_insert_mappings(table_class, inserts)
+        except Exception as msg:
+            breakpoint()
+            exit(msg)
+
+    session.commit()
+
+
 def row2dict(row):
     d = row.__dict__
     d.pop('_sa_instance_state', None)
@@ -2569,45 +2615,6 @@ def get_era5_corners_of_rss_cell(lat, lon, era5_lats_grid,
                                       lon2_idx]
 
 
-def get_era5_corners_of_cell(lat, lon, era5_lats_grid,
-                             era5_lons_grid):
-    era5_lats = list(era5_lats_grid[:, 0])
-    era5_lons = list(era5_lons_grid[0, :])
-
-    try:
-        nearest_lat, nearest_lat_idx = \
-                get_nearest_element_and_index(era5_lats, lat)
-        if nearest_lat < lat:
-            lat1 = nearest_lat
-            lat1_idx = nearest_lat_idx
-            lat2_idx = lat1_idx + 1
-            lat2 = era5_lats[lat2_idx]
-        else:
-            lat2 = nearest_lat
-            lat2_idx = nearest_lat_idx
-            lat1_idx = lat2_idx - 1
-            lat1 = era5_lats[lat1_idx]
-
-        nearest_lon, nearest_lon_idx = \
-            get_nearest_element_and_index(era5_lons, lon)
-        if nearest_lon < lon:
-            lon1 = nearest_lon
-            lon1_idx = nearest_lon_idx
-            lon2_idx = lon1_idx + 1
-            lon2 = era5_lons[lon2_idx]
-        else:
-            lon2 = nearest_lon
-            lon2_idx = nearest_lon_idx
-            lon1_idx = lon2_idx - 1
-            lon1 = era5_lons[lon1_idx]
-    except Exception as msg:
-        breakpoint()
-        exit(msg)
-
-    return [lat1, lat2, lon1, lon2], [lat1_idx, lat2_idx, lon1_idx,
-                                      lon2_idx]
-
-
 def find_neighbours_of_pt_in_half_degree_grid(pt):
     nearest = round(pt * 2) / 2
     direction = ((pt - nearest) / abs(pt - nearest))
@@ -2644,6 +2651,7 @@ def get_tc_center(tc_row):
     return center
 
 
+@functools.lru_cache(maxsize=256)
 def process_grib_message_name(name):
     return name.replace(" ", "_").replace("-", "_").replace('(', '')\
             .replace(')', '').lower()
@@ -4443,10 +4451,7 @@ def create_smap_era5_table(the_class, dt, suffix=''):
     cols.append(Column('smap_u_wind', Float, nullable=False))
     cols.append(Column('smap_v_wind', Float, nullable=False))
 
-    era5_ = era5.ERA5Manager(the_class.CONFIG, the_class.period,
-                             the_class.region,
-                             the_class.db_root_passwd, False,
-                             the_class.save_disk, '', 'tc')
+    era5_ = get_era5_manager(the_class)
     era5_cols = era5_.get_era5_columns()
     cols = cols + era5_cols
 
@@ -4465,6 +4470,25 @@ def create_smap_era5_table(the_class, dt, suffix=''):
     return Satel
 
 
+def get_era5_manager(the_class):
+    """Get ERA5 manager of the_class.  Construct a new one if the_class
+    does not hold an `era5_manager`.
+
+    """
+    era5_manager = getattr(the_class, 'era5_manager', None)
+    if era5_manager is None:
+        era5_manager = era5.ERA5Manager(the_class.CONFIG,
+                                        the_class.period,
+                                        the_class.region,
+                                        the_class.db_root_passwd,
+                                        work=False,
+                                        save_disk=the_class.save_disk,
+                                        work_mode='',
+                                        vars_mode='')
+
+    return era5_manager
+
+
 def add_era5(the_class, tgt_name, tc, tgt_part, hourtimes, area):
     try:
         era5_step_1, pres_lvls = extract_era5_single_levels(
@@ -4485,14 +4509,7 @@ def add_era5(the_class, tgt_name, tc, tgt_part, hourtimes, area):
 
 def extract_era5_single_levels(the_class, tgt_name, tc, tgt_part,
                                hourtimes, area):
-    era5_manager = era5.ERA5Manager(the_class.CONFIG,
-                                    the_class.period,
-                                    the_class.region,
-                                    the_class.db_root_passwd,
-                                    work=False,
-                                    save_disk=the_class.save_disk,
-                                    work_mode='',
-                                    vars_mode='')
+    era5_manager = get_era5_manager(the_class)
     try:
         era5_file_path = \
                 era5_manager.download_single_levels_vars(
@@ -4521,14 +4538,7 @@ def extract_era5_single_levels(the_class, tgt_name, tc, tgt_part,
 def extract_era5_pressure_levels(the_class, tgt_name, tc,
                                  era5_step_1, hourtimes, area,
                                  pres_lvls):
-    era5_manager = era5.ERA5Manager(the_class.CONFIG,
-                                    the_class.period,
-                                    the_class.region,
-                                    the_class.db_root_passwd,
-                                    work=False,
-                                    save_disk=the_class.save_disk,
-                                    work_mode='',
-                                    vars_mode='')
+    era5_manager = get_era5_manager(the_class)
     try:
         era5_file_path = \
                 era5_manager.download_pressure_levels_vars(
@@ -4564,137 +4574,78 @@ def add_era5_single_levels(the_class, era5_file_path, tc_dt, tgt_name,
         if tgt_name in the_class.CONFIG['satel_data_sources']['rss']:
             tgt_from_rss = True
             rss_tgt_name = 'satel'
-            hourtime_row_mapper = get_hourtime_row_mapper(tgt_part,
-                                                          rss_tgt_name)
+            hourtime_row_mapper, row_minutes = get_hourtime_row_mapper(
+                tgt_part, rss_tgt_name)
         else:
-            hourtime_row_mapper = get_hourtime_row_mapper(tgt_part,
-                                                          tgt_name)
-        north, west, south, east = area
+            hourtime_row_mapper, row_minutes = get_hourtime_row_mapper(
+                tgt_part, tgt_name)
 
-        count = 0
-
-        grbidx = pygrib.index(era5_file_path, 'dataTime')
         indices_of_rows_to_delete = set()
+        # Grids of area in messages, keyed by spatial resolution
+        grb_grids = dict()
+
+        with contextlib.closing(pygrib.index(era5_file_path,
+                                             'dataTime')) as grbidx:
+            # For every hour, update corresponding rows with grbs
+            for hour, row_indices in hourtime_row_mapper.items():
+                grb_time = datetime.time(hour, 0, 0)
+
+                rows_lat = np.array([tgt_part[i].lat for i in row_indices])
+                rows_lon = np.array([tgt_part[i].lon for i in row_indices])
+
+                # Datetime of ERA5 and difference of minutes between target
+                # and ERA5 only depend on row and hour
+                era5_datetime = datetime.datetime.combine(
+                    tc_dt.date(), grb_time)
+                grb_minute = hour * 60
+                if tgt_from_rss:
+                    diff_mins_name = f'{rss_tgt_name}_era5_diff_mins'
+                else:
+                    diff_mins_name = f'{tgt_name}_era5_diff_mins'
 
-        # For every hour, update corresponding rows with grbs
-        for hourtime in range(0, 2400, 100):
-            if not len(hourtime_row_mapper[hourtime]):
-                continue
-            grb_time = datetime.time(int(hourtime/100), 0, 0)
-
-            selected_grbs = grbidx.select(dataTime=hourtime)
-
-            for grb in selected_grbs:
-                # Generate name which is the same with table column
-                name = process_grib_message_name(grb.name)
-                grb_spa_resolu = grb.jDirectionIncrementInDegrees
-                # data() method of pygrib is time-consuming
-                # So apply it to global area then update all
-                # smap part with grb of specific hourtime,
-                # which using data() method as less as possible
-                data, lats, lons = grb.data(south, north, west, east)
-                data = np.flip(data, 0)
-                lats = np.flip(lats, 0)
-                lons = np.flip(lons, 0)
-
-                masked_data = False
-                # MUST check masked array like this, because if an array
-                # is numpy.ma.core.MaskedArray, it is numpy.ndarray too.
-                # So only directly check whether an array is instance
-                # of numpy.ma.core.MaskedArray is safe.
-                if isinstance(data, np.ma.core.MaskedArray):
-                    masked_data = True
-
-                # Update all rows which matching this hourtime
-                for row_idx in hourtime_row_mapper[hourtime]:
-                    count += 1
-                    # print((f"""\r{name}: {count}/{total}"""), end='')
+                for row_idx in row_indices:
                     row = tgt_part[row_idx]
-
-                    row.era5_datetime = datetime.datetime.combine(
-                        tc_dt.date(), grb_time)
-
-                    if tgt_from_rss:
-                        tgt_datetime = getattr(row,
-                                               f'{rss_tgt_name}_datetime')
-                    else:
-                        tgt_datetime = getattr(row,
-                                               f'{tgt_name}_datetime')
-
-                    tgt_minute = (tgt_datetime.hour * 60
-                                  + tgt_datetime.minute)
-                    grb_minute = int(hourtime/100) * 60
-
-                    if tgt_from_rss:
-                        setattr(row, f'{rss_tgt_name}_era5_diff_mins',
-                                tgt_minute - grb_minute)
-                    else:
-                        setattr(row, f'{tgt_name}_era5_diff_mins',
-                                tgt_minute - grb_minute)
-
+                    row.era5_datetime = era5_datetime
+                    setattr(row, diff_mins_name,
+                            row_minutes[row_idx] - grb_minute)
+
+                selected_grbs = grbidx.select(dataTime=hour * 100)
+
+                for grb in selected_grbs:
+                    # Generate name which is the same with table column
+                    name = process_grib_message_name(grb.name)
+                    grb_spa_resolu = grb.jDirectionIncrementInDegrees
+                    # data() method of pygrib is time-consuming, because
+                    # it locates area in the whole message every time.
+                    # So only locate area once for every spatial resolution
+                    # and slice values of message directly
+                    lats, lons, lat_slice, lon_slice = get_grb_grid_in_area(
+                        grb, area, grb_grids)
+                    # Reversed view, values are only read afterwards
+                    data = grb.values[lat_slice, lon_slice][::-1]
+
+                    # Interpolate all rows of this hour at once
                     try:
-                        if tgt_from_rss:
-                            latlons, latlon_indices = \
-                                    get_era5_corners_of_rss_cell(
-                                        row.lat, row.lon, lats, lons,
-                                        grb_spa_resolu)
-                        else:
-                            latlons, latlon_indices = \
-                                    get_era5_corners_of_cell(
-                                        row.lat, row.lon, lats, lons)
+                        values, masked = values_of_pts_in_era5_grid(
+                            data, lats, lons, rows_lat, rows_lon,
+                            grb_spa_resolu, tgt_from_rss)
                     except Exception as msg:
                         breakpoint()
                         exit(msg)
-                    lat1, lat2, lon1, lon2 = latlons
-                    lat1_idx, lat2_idx, lon1_idx, lon2_idx = \
-                        latlon_indices
-
-                    skip_row = False
-                    # Check out whether there is masked cell in square
-                    if masked_data:
-                        for tmp_lat_idx in [lat1_idx, lat2_idx]:
-                            for tmp_lon_idx in [lon1_idx, lon2_idx]:
-                                if data.mask[tmp_lat_idx][tmp_lon_idx]:
-                                    skip_row = True
-                                    indices_of_rows_to_delete.add(
-                                        row_idx)
-                    if skip_row:
-                        continue
 
-                    square_data = data[lat1_idx:lat2_idx+1,
-                                       lon1_idx:lon2_idx+1]
-                    square_lats = lats[lat1_idx:lat2_idx+1,
-                                       lon1_idx:lon2_idx+1]
-                    square_lons = lons[lat1_idx:lat2_idx+1,
-                                       lon1_idx:lon2_idx+1]
-
-                    # ERA5 atmospheric variable
-                    if tgt_from_rss and grb_spa_resolu == 0.25:
-                        value = float(square_data.mean())
-                    # ERA5 oceanic variable
-                    else:
-                        value = value_of_pt_in_era5_square(
-                            square_data, square_lats, square_lons,
-                            row.lat, row.lon)
-                        if value is None:
-                            # the_class.logger.warning((
-                            #     f"""[{name}] Not a square consists of """
-                            #     f"""four ERA5 grid points"""))
-                            breakpoint()
+                    for row_idx, value, row_masked in zip(row_indices, values,
+                                                          masked):
+                        # Skip row whose square has masked cell
+                        if row_masked:
+                            indices_of_rows_to_delete.add(row_idx)
                             continue
 
-                    setattr(row, name, value)
-
-                    # if (tc_dt == datetime.datetime(2015, 5, 7, 23, 0, 0)
-                    #     and (name == '2_metre_temperature'
-                    #          or name == 'mean_direction_of_total_swell')
-                    #     and row.x == -11 and row.y == -8):
-                    #     breakpoint()
+                        setattr(tgt_part[row_idx], name, float(value))
 
-                delete_last_lines()
-                # print(f'{name}: Done')
-
-        grbidx.close()
+                    # Log once per message rather than printing progress
+                    # of every row
+                    the_class.logger.debug((f"""[{name}] {grb_time}: """
+                                            f"""{len(row_indices)} rows"""))
 
         # Move rows of tgt_part which should not deleted to a new
         # list to accomplish filtering rows with masked data
@@ -4739,140 +4690,92 @@ def add_era5_pressure_levels(the_class, era5_file_path, tc_dt,
         if tgt_name in the_class.CONFIG['satel_data_sources']['rss']:
             tgt_from_rss = True
             rss_tgt_name = 'satel'
-            hourtime_row_mapper = get_hourtime_row_mapper(era5_step_1,
-                                                          rss_tgt_name)
+            hourtime_row_mapper, row_minutes = get_hourtime_row_mapper(
+                era5_step_1, rss_tgt_name)
         else:
-            hourtime_row_mapper = get_hourtime_row_mapper(era5_step_1,
-                                                          tgt_name)
-        north, west, south, east = area
+            hourtime_row_mapper, row_minutes = get_hourtime_row_mapper(
+                era5_step_1, tgt_name)
 
-        count = 0
-
-        grbidx = pygrib.index(era5_file_path, 'dataTime')
         indices_of_rows_to_delete = set()
+        # Grids of area in messages, keyed by spatial resolution
+        grb_grids = dict()
+
+        with contextlib.closing(pygrib.index(era5_file_path,
+                                             'dataTime')) as grbidx:
+            # For every hour, update corresponding rows with grbs
+            for hour, row_indices in hourtime_row_mapper.items():
+                grb_time = datetime.time(hour, 0, 0)
+
+                rows_lat = np.array([era5_step_1[i].lat for i in row_indices])
+                rows_lon = np.array([era5_step_1[i].lon for i in row_indices])
+                rows_pres_lvl = np.array([pres_lvls[i] for i in row_indices])
+
+                # Datetime of ERA5 and difference of minutes between target
+                # and ERA5 only depend on row and hour
+                era5_datetime = datetime.datetime.combine(
+                    tc_dt.date(), grb_time)
+                grb_minute = hour * 60
+                if tgt_from_rss:
+                    diff_mins_name = f'{rss_tgt_name}_era5_diff_mins'
+                else:
+                    diff_mins_name = f'{tgt_name}_era5_diff_mins'
 
-        # For every hour, update corresponding rows with grbs
-        for hourtime in range(0, 2400, 100):
-            if not len(hourtime_row_mapper[hourtime]):
-                continue
-            grb_time = datetime.time(int(hourtime/100), 0, 0)
-
-            selected_grbs = grbidx.select(dataTime=hourtime)
-
-            for grb in selected_grbs:
-                # Generate name which is the same with table column
-                name = process_grib_message_name(grb.name)
-                grb_spa_resolu = grb.jDirectionIncrementInDegrees
-                # data() method of pygrib is time-consuming
-                # So apply it to global area then update all
-                # smap part with grb of specific hourtime,
-                # which using data() method as less as possible
-                data, lats, lons = grb.data(south, north, west, east)
-                data = np.flip(data, 0)
-                lats = np.flip(lats, 0)
-                lons = np.flip(lons, 0)
-
-                masked_data = False
-                # MUST check masked array like this, because if an array
-                # is numpy.ma.core.MaskedArray, it is numpy.ndarray too.
-                # So only directly check whether an array is instance
-                # of numpy.ma.core.MaskedArray is safe.
-                if isinstance(data, np.ma.core.MaskedArray):
-                    masked_data = True
-
-                # Update all rows which matching this hourtime
-                for row_idx in hourtime_row_mapper[hourtime]:
-                    count += 1
-                    # print((f"""\r{name}: {count}/{total}"""), end='')
-
-                    # Skip this turn if pressure level of grb does not
-                    # equal to the pressure level of point of
-                    # era5_step_1
-                    if pres_lvls[row_idx] != grb.level:
-                        continue
-
+                for row_idx in row_indices:
                     row = era5_step_1[row_idx]
 
-                    era5_datetime = datetime.datetime.combine(
-                        tc_dt.date(), grb_time)
                     if row.era5_datetime != era5_datetime:
                         the_class.logger.error((f"""datetime not same """
                                                 f"""in two steps of """
                                                 f"""extracting ERA5"""))
 
-                    if tgt_from_rss:
-                        tgt_datetime = getattr(row,
-                                               f'{rss_tgt_name}_datetime')
-                    else:
-                        tgt_datetime = getattr(row, f'{tgt_name}_datetime')
-
-                    tgt_minute = (tgt_datetime.hour * 60
-                                  + tgt_datetime.minute)
-                    grb_minute = int(hourtime/100) * 60
-                    tgt_era5_diff_mins = tgt_minute - grb_minute
-
-                    if tgt_from_rss:
-                        existing_diff_mins = getattr(
-                            row, f'{rss_tgt_name}_era5_diff_mins')
-                    else:
-                        existing_diff_mins = getattr(
-                            row, f'{tgt_name}_era5_diff_mins')
-
-                    if existing_diff_mins != tgt_era5_diff_mins:
+                    tgt_era5_diff_mins = row_minutes[row_idx] - grb_minute
+                    if getattr(row, diff_mins_name) != tgt_era5_diff_mins:
                         the_class.logger.error((
                             f"""diff_mins not same in two steps of """
                             f"""extracting ERA5"""))
 
-                    if tgt_from_rss:
-                        latlons, latlon_indices = \
-                                get_era5_corners_of_rss_cell(
-                                    row.lat, row.lon, lats, lons,
-                                    grb_spa_resolu)
-                    else:
-                        latlons, latlon_indices = \
-                                get_era5_corners_of_cell(
-                                    row.lat, row.lon, lats, lons)
-                    lat1, lat2, lon1, lon2 = latlons
-                    lat1_idx, lat2_idx, lon1_idx, lon2_idx = \
-                        latlon_indices
-
-                    skip_row = False
-                    # Check out whether there is masked cell in square
-                    if masked_data:
-                        for tmp_lat_idx in [lat1_idx, lat2_idx]:
-                            for tmp_lon_idx in [lon1_idx, lon2_idx]:
-                                if data.mask[tmp_lat_idx][tmp_lon_idx]:
-                                    skip_row = True
-                                    indices_of_rows_to_delete.add(
-                                        row_idx)
-                    if skip_row:
-                        continue
-
-                    square_data = data[lat1_idx:lat2_idx+1,
-                                       lon1_idx:lon2_idx+1]
-                    square_lats = lats[lat1_idx:lat2_idx+1,
-                                       lon1_idx:lon2_idx+1]
-                    square_lons = lons[lat1_idx:lat2_idx+1,
-                                       lon1_idx:lon2_idx+1]
-
-                    if tgt_from_rss and grb_spa_resolu == 0.25:
-                        value = float(square_data.mean())
-                    else:
-                        value = value_of_pt_in_era5_square(
-                            square_data, square_lats, square_lons,
-                            row.lat, row.lon)
-                        if value is None:
-                            # the_class.logger.warning((
-                            #     f"""[{name}] Not a square consists of """
-                            #     f"""four ERA5 grid points"""))
-                            breakpoint()
+                selected_grbs = grbidx.select(dataTime=hour * 100)
+
+                for grb in selected_grbs:
+                    # Generate name which is the same with table column
+                    name = process_grib_message_name(grb.name)
+                    grb_spa_resolu = grb.jDirectionIncrementInDegrees
+                    # data() method of pygrib is time-consuming, because
+                    # it locates area in the whole message every time.
+                    # So only locate area once for every spatial resolution
+                    # and slice values of message directly
+                    lats, lons, lat_slice, lon_slice = get_grb_grid_in_area(
+                        grb, area, grb_grids)
+                    # Reversed view, values are only read afterwards
+                    data = grb.values[lat_slice, lon_slice][::-1]
+
+                    # Update all rows which matching this hour and
+                    # pressure level of grb
+                    level_mask = rows_pres_lvl == grb.level
+                    level_row_indices = [
+                        row_idx for row_idx, same_level in zip(
+                            row_indices, level_mask) if same_level]
+
+                    # Interpolate all rows of this hour and pressure
+                    # level at once
+                    values, masked = values_of_pts_in_era5_grid(
+                        data, lats, lons, rows_lat[level_mask],
+                        rows_lon[level_mask], grb_spa_resolu, tgt_from_rss)
+
+                    for row_idx, value, row_masked in zip(level_row_indices,
+                                                          values, masked):
+                        # Skip row whose square has masked cell
+                        if row_masked:
+                            indices_of_rows_to_delete.add(row_idx)
                             continue
 
-                    setattr(row, name, value)
+                        setattr(era5_step_1[row_idx], name, float(value))
 
-                delete_last_lines()
-
-        grbidx.close()
+                    # Log once per message rather than printing progress
+                    # of every row
+                    the_class.logger.debug((
+                        f"""[{name}] {grb_time} {grb.level} hPa: """
+                        f"""{len(level_row_indices)} rows"""))
 
         # Move rows of era5_step_1 which should not deleted to a new
         # list to accomplish filtering rows with masked data
@@ -4887,33 +4790,165 @@ def add_era5_pressure_levels(the_class, era5_file_path, tc_dt,
     return result
 
 
+def get_grb_grid_in_area(grb, area, grb_grids):
+    """Get grid of area in GRIB message like `data()` method of pygrib.
+
+    Messages of same spatial resolution in one GRIB file share one grid,
+    so grid is located only once and cached in `grb_grids`.
+
+    Parameters
+    ----------
+    grb: pygrib.gribmessage
+    area: list
+        North, West, South, East.
+    grb_grids: dict
+        Cache of grids keyed by spatial resolution.
+
+    Returns
+    -------
+    lats: numpy.ndarray
+    lons: numpy.ndarray
+        Latitude increases along axis 0, so values sliced from message
+        should be flipped along axis 0 too.
+    lat_slice: slice
+    lon_slice: slice
+        Slices to extract values of area from `grb.values`.
+
+    """
+    grb_spa_resolu = grb.jDirectionIncrementInDegrees
+    if grb_spa_resolu not in grb_grids:
+        north, west, south, east = area
+        all_lats, all_lons = grb.latlons()
+
+        lat_indices = np.nonzero((all_lats[:, 0] >= south)
+                                 & (all_lats[:, 0] <= north))[0]
+        lon_indices = np.nonzero((all_lons[0, :] >= west)
+                                 & (all_lons[0, :] <= east))[0]
+        lat_slice = slice(lat_indices[0], lat_indices[-1] + 1)
+        lon_slice = slice(lon_indices[0], lon_indices[-1] + 1)
+
+        lats = all_lats[lat_slice, lon_slice][::-1]
+        lons = all_lons[lat_slice, lon_slice][::-1]
+
+        grb_grids[grb_spa_resolu] = (lats, lons, lat_slice, lon_slice)
+
+    return grb_grids[grb_spa_resolu]
+
+
 def get_hourtime_row_mapper(tgt_part, tgt_name):
+    """Map hour (0 to 23) to indices of rows which are closest to it.
+    Only hours which have rows are included.
+
+    Also return minutes of day of rows, which only depend on rows and
+    are reused for every GRIB message.
+
+    """
     tgt_datetime_name = f'{tgt_name}_datetime'
     tgt_day = getattr(tgt_part[0], tgt_datetime_name).day
-    hourtime_row_mapper = dict()
-
-    for hourtime in range(0, 2400, 100):
-        hourtime_row_mapper[hourtime] = []
+    hourtime_row_mapper = defaultdict(list)
+    row_minutes = dict()
 
     for idx, row in enumerate(tgt_part):
-        hour_roundered_dt = hour_rounder(
-            getattr(row, tgt_datetime_name))
+        tgt_datetime = getattr(row, tgt_datetime_name)
+        hour_roundered_dt = hour_rounder(tgt_datetime)
         # Skip situation that rounded hour is on next day
         if hour_roundered_dt.day == tgt_day:
-            closest_time = 100 * hour_roundered_dt.hour
-            hourtime_row_mapper[closest_time].append(idx)
+            hourtime_row_mapper[hour_roundered_dt.hour].append(idx)
+            row_minutes[idx] = (tgt_datetime.hour * 60
+                                + tgt_datetime.minute)
 
-    return hourtime_row_mapper
+    return hourtime_row_mapper, row_minutes
 
 
-def value_of_pt_in_era5_square(data, lats, lons, pt_lat, pt_lon):
-    if lats.shape != (2, 2) or lons.shape != (2, 2):
-        return None
+def values_of_pts_in_era5_grid(data, lats, lons, pts_lat, pts_lon,
+                               grb_spa_resolu, rss_cell):
+    """Get values of points in ERA5 grid in one batch.
+
+    Square around every point is located arithmetically, then its four
+    corners are averaged (RSS cell at 0.25 degree) or bilinearly
+    interpolated.  RSS cells use the same corners as
+    `get_era5_corners_of_rss_cell`.
+
+    Parameters
+    ----------
+    data: numpy.ndarray or numpy.ma.core.MaskedArray
+        Data of GRIB message.  Latitude must increase along axis 0.
+    lats: numpy.ndarray
+    lons: numpy.ndarray
+    pts_lat: numpy.ndarray
+    pts_lon: numpy.ndarray
+    grb_spa_resolu: float
+        Spatial resolution of GRIB message in degree.
+    rss_cell: bool
+        Whether points are centers of RSS grid cells.
 
-    f = interpolate.interp2d(lons, lats, data)
-    value = f(pt_lon, pt_lat)
+    Returns
+    -------
+    values: numpy.ndarray
+        Values of points.  Meaningless where `masked` is True.
+    masked: numpy.ndarray
+        Whether any corner of square around point is masked or out of
+        grid.
 
-    return float(value)
+    """
+    lat_origin = lats[0, 0]
+    lon_origin = lons[0, 0]
+
+    if rss_cell and grb_spa_resolu == 0.25:
+        # Center of RSS cell is center of ERA5 cell
+        delta = 0.5 * 0.25
+        lat1_idx = np.rint((pts_lat - delta - lat_origin)
+                           / grb_spa_resolu).astype(int)
+        lon1_idx = np.rint((pts_lon - delta - lon_origin)
+                           / grb_spa_resolu).astype(int)
+    else:
+        # Point on grid line is regarded as the upper bound of square
+        lat1_idx = np.ceil(np.round((pts_lat - lat_origin)
+                                    / grb_spa_resolu, 6)).astype(int) - 1
+        lon1_idx = np.ceil(np.round((pts_lon - lon_origin)
+                                    / grb_spa_resolu, 6)).astype(int) - 1
+    # Square around point on or outside the edge of grid is
+    # incomplete, so regard it as masked instead of letting negative
+    # indices wrap to the opposite edge
+    out_of_grid = ((lat1_idx < 0) | (lat1_idx + 1 >= data.shape[0])
+                   | (lon1_idx < 0) | (lon1_idx + 1 >= data.shape[1]))
+    lat1_idx = np.clip(lat1_idx, 0, data.shape[0] - 2)
+    lon1_idx = np.clip(lon1_idx, 0, data.shape[1] - 2)
+    lat2_idx = lat1_idx + 1
+    lon2_idx = lon1_idx + 1
+
+    mask = np.ma.getmaskarray(data)
+    masked = (out_of_grid
+              | mask[lat1_idx, lon1_idx] | mask[lat1_idx, lon2_idx]
+              | mask[lat2_idx, lon1_idx] | mask[lat2_idx, lon2_idx])
+
+    data = np.ma.getdata(data)
+    d11 = data[lat1_idx, lon1_idx]
+    d12 = data[lat1_idx, lon2_idx]
+    d21 = data[lat2_idx, lon1_idx]
+    d22 = data[lat2_idx, lon2_idx]
+
+    # ERA5 atmospheric variable
+    if rss_cell and grb_spa_resolu == 0.25:
+        values = (d11 + d12 + d21 + d22) / 4
+    # ERA5 oceanic variable
+    else:
+        lat1 = lats[lat1_idx, lon1_idx]
+        lat2 = lats[lat2_idx, lon1_idx]
+        lon1 = lons[lat1_idx, lon1_idx]
+        lon2 = lons[lat1_idx, lon2_idx]
+        # Degenerate square: interpolate along the other axis only
+        lon_span = np.where(lon2 != lon1, lon2 - lon1, 1.0)
+        lat_span = np.where(lat2 != lat1, lat2 - lat1, 1.0)
+        tx = np.where(lon2 != lon1, (pts_lon - lon1) / lon_span, 0.0)
+        ty = np.where(lat2 != lat1, (pts_lat - lat1) / lat_span, 0.0)
+
+        values = (d11 * (1 - tx) * (1 - ty)
+                  + d12 * tx * (1 - ty)
+                  + d21 * (1 - tx) * ty
+                  + d22 * tx * ty)
+
+    return values.astype(float), masked
 
 
 def gen_match_tablenname(the_class, sources):